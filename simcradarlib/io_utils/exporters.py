@@ -187,7 +187,7 @@ class ExportableVar(StructVariable):
             g5.attrs.__setitem__("quantity", self.data_qty_name.encode("utf-8"))
 
             # forse dovrei togliere il vincolo di FORECAST in what/product e lasciare solo la condizione sulla shape
-            if (len(field_values.shape) == 3) & ("FORECAST" in g2.attrs.__getitem__("product").decode("utf-8")):
+            if (len(field_values.shape) == 3) & ("FORECAST" in g2.attrs.__getitem__("product").decode("ascii")):
                 g3.attrs.__setitem__("forecast runs", field_values.shape[0])
                 g4.attrs.__setitem__("xsize", field_values.shape[2])
                 g4.attrs.__setitem__("ysize", field_values.shape[1])
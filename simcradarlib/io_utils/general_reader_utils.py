@@ -192,7 +192,7 @@ def get_meta_for_pysteps_from_macro(macro: dict, timestamps: Union[np.ndarray, L
     else:
         module_logger.warning(
             f"Non riesco ad individuare stringa di proiezione tramite {proj_id_structure}.\
-        struct PROJECTION has items : {macro['PROJECTION'].__dict__}"
+        struct PROJECTION has items : {macro['PROJECTION']._struct_attrs()}"
         )
 
     p = pyproj.Proj(projstring)
@@ -10,15 +10,117 @@ from simcradarlib.io_utils.structure_class import (
     # npt,
 )
 import logging
+import os
+from collections import OrderedDict
 from netCDF4 import num2date, Dataset
 from typing import Tuple, Union, Dict
 import numpy as np
 
 module_logger = logging.getLogger(__name__)
 
+# attributi base di StructVariable e parametri extra cercati sulle variabili
+# associate a campi fisici nei netCDF
+_BASIC_ATTRS = frozenset(
+    [
+        "long_name",
+        "standard_name",
+        "units",
+        "min_val",
+        "max_val",
+        "missing",
+        "undetect",
+        "accum_time_h",
+    ]
+)
+_EXTRA_PARAMS = frozenset(
+    [
+        "offset",
+        "scale_factor",
+        "n_byte",
+        "val_compresso",
+        "_FillValue",
+        "valid_min",
+        "valid_max",
+        "valid_range",
+        "var_missing",
+        "undetectable",
+    ]
+)
 
-def readnc_to_struct(
+try:
+    # opzionale: usata solo per mappare in memoria i campi dei file NETCDF3
+    from scipy.io import netcdf_file as _scipy_netcdf_file
+except ImportError:
+    _scipy_netcdf_file = None
+
+try:
+    # opzionale: kernel jittato per la conversione a float32 dei campi
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True, fastmath=True)
+    def _cast_f32_kernel(src, out):  # pragma: no cover
+        for i in numba.prange(src.size):
+            out[i] = np.float32(src[i])
+
+
+def _cast_f32(arr: np.ndarray) -> np.ndarray:
+
+    """
+    Converte il campo letto in float32 con un'unica passata lineare.
+    Se numba è disponibile usa un kernel jittato parallelo, altrimenti
+    ricade su np.ndarray.astype (senza copia se il dtype è già float32).
+    """
+
+    if numba is None or arr.dtype == np.float32 or not arr.flags["C_CONTIGUOUS"]:
+        return arr.astype(np.float32, copy=False)
+    out = np.empty(arr.shape, np.float32)
+    _cast_f32_kernel(arr.ravel(), out.ravel())
+    return out
+
+
+def _read_nc3_memmap(filename: str, varname: str) -> Union[np.ndarray, None]:
+
+    """
+    Prova a leggere il campo varname da un file NETCDF3 classic tramite
+    scipy.io.netcdf_file con mmap: i dati mappati vengono copiati in un
+    array float32 (stesso contratto della lettura standard) e il file viene
+    chiuso subito, così il mapping è rilasciato senza il RuntimeWarning di
+    scipy alla garbage collection.
+
+    Restituisce None, lasciando la parola alla lettura standard netCDF4,
+    se scipy non è disponibile, se la lettura fallisce o se la variabile
+    porta attributi di packing (scale_factor/add_offset/offset): scipy apre
+    con maskandscale=False e restituirebbe i valori raw non decodificati.
+    """
+
+    if _scipy_netcdf_file is None:
+        return None
+    try:
+        f = _scipy_netcdf_file(filename, "r", mmap=True)
+        try:
+            var = f.variables[varname]
+            if hasattr(var, "scale_factor") or hasattr(var, "add_offset") or hasattr(var, "offset"):
+                return None
+            # astype copia fuori dal mapping: l'array restituito è float32 e
+            # indipendente dal file, che può quindi essere chiuso qui sotto
+            data = var.data.astype(np.float32)
+            del var
+            return data
+        finally:
+            f.close()
+    except Exception:
+        module_logger.debug("memmap NETCDF3 non riuscito per %s: uso lettura standard", varname)
+        return None
+
+
+def _readnc_to_struct_impl(
     filename: str,
+    parallel: bool = False,
+    comm=None,
 ) -> Tuple[
     Dict[
         str,
@@ -47,6 +149,13 @@ def readnc_to_struct(
     ______
     INPUT:
     - filename  --str  :  nome del file netCDF da leggere comprensivo del path.
+    - parallel  --bool :  (default False) se True apre il file in modalità parallela
+                          MPI-IO (richiede mpi4py e netCDF4 compilato con supporto
+                          parallelo) e usa letture collettive per i campi. Utile per
+                          l'ingestione batch su filesystem paralleli; il comportamento
+                          di default resta seriale.
+    - comm             :  (default None) comunicatore MPI da usare se parallel=True;
+                          se None viene usato mpi4py.MPI.COMM_WORLD.
     ______
     OUTPUT:
     -macro      --dict :  dizionario avente come values le strutture contenenti le informazioni sui dati,
@@ -167,7 +276,19 @@ def readnc_to_struct(
                                un campo fisico.
     """
 
-    nc = Dataset(filename, "r")
+    if parallel:
+        # import pigro: mpi4py è richiesto solo per la lettura parallela
+        from mpi4py import MPI
+
+        if comm is None:
+            comm = MPI.COMM_WORLD
+        nc = Dataset(filename, "r", parallel=True, comm=comm)
+    else:
+        nc = Dataset(filename, "r")
+
+    # niente MaskedArray: le letture restituiscono direttamente ndarray,
+    # evitando il calcolo della maschera su ogni campo (subito scartata a valle)
+    nc.set_auto_mask(False)
 
     """ __________________________________struttura TIME__________________________________
         Vengono gestiti anche i file netCDF in cui il campo 'time' non è netCDF compliant
@@ -188,22 +309,20 @@ def readnc_to_struct(
 
     try:
 
-        time_to_read = nc["time"].units.split(" ")
+        t_var = nc["time"]
+        units = t_var.units
+        time_to_read = units.split(" ", 2)
 
         if "since" not in time_to_read:
-
             # se le units di time non sono CF-compliant, le correggo e
             # estraggo data_validita come datetime da num2date usando units ricorrette
             time_to_read[1] = "since"
-            units_new = " ".join(time_to_read)
-            time_struct.date_time_validita = num2date(nc["time"][:], units_new, only_use_cftime_datetimes=False)[0]
-            time_struct.acc_time_unit = time_to_read[0]
+            units = " ".join(time_to_read)
 
-        else:
-            time_struct.date_time_validita = num2date(nc["time"][:], nc["time"].units, only_use_cftime_datetimes=False)[
-                0
-            ]
-            time_struct.acc_time_unit = time_to_read[0]
+        # leggo solo il primo elemento: il vettore time completo può essere
+        # lungo (file con append) e viene comunque scartato dopo l'indice 0
+        time_struct.date_time_validita = num2date(t_var[0:1], units, only_use_cftime_datetimes=False)[0]
+        time_struct.acc_time_unit = time_to_read[0]
 
         # data validità=data emissione perchè dato osservato. Per rendere il codice più generale sarebbe bello
         # inserire una keyword nel commento o nel file di config
@@ -217,25 +336,29 @@ def readnc_to_struct(
 
     grid_struct = StructGrid()
 
-    if "geo_dim" in nc.variables:
-        grid_struct.limiti = nc["geo_dim"][:].data
-    elif "geo_limits" in nc.variables:
-        # prima del 2013/04/09 il nome dei limiti del grigliato era diverso
-        grid_struct.limiti = nc["geo_limits"][:].data
+    # dizionario delle variabili cercate una volta sola: var_cache.get() fa un
+    # unico lookup invece del test "in" seguito da nc.__getitem__ (che itera i gruppi)
+    var_cache = nc.variables
+
+    # prima del 2013/04/09 il nome dei limiti del grigliato era geo_limits
+    gd = var_cache.get("geo_dim")
+    if gd is None:
+        gd = var_cache.get("geo_limits")
+    if gd is not None:
+        grid_struct.limiti = gd[:]
     else:
         module_logger.debug("Non trovo la variabile geo_dim: prima lettura limiti griglia fallita!")
 
-    if "mesh_dim" in nc.variables:
-        grid_struct.dx = nc["mesh_dim"][:].data[0]
-        grid_struct.dy = nc["mesh_dim"][:].data[1]
-        grid_struct.units_dx = nc["mesh_dim"].units
-        grid_struct.units_dy = nc["mesh_dim"].units
-    elif "grid_mesh" in nc.variables:
-        # prima del 2023/04/09 il nome mesh_dim era grid_mesh nei netcdf.
-        grid_struct.dx = nc["grid_mesh"][:].data[0]
-        grid_struct.dy = nc["grid_mesh"][:].data[1]
-        grid_struct.units_dx = nc["grid_mesh"].units
-        grid_struct.units_dy = nc["grid_mesh"].units
+    # prima del 2023/04/09 il nome mesh_dim era grid_mesh nei netcdf.
+    md = var_cache.get("mesh_dim")
+    if md is None:
+        md = var_cache.get("grid_mesh")
+    if md is not None:
+        mesh_vals = md[:]
+        grid_struct.dx = mesh_vals[0]
+        grid_struct.dy = mesh_vals[1]
+        grid_struct.units_dx = md.units
+        grid_struct.units_dy = md.units
     else:
         module_logger.debug("Non trovo la variabile mesh_dim: prima lettura passo griglia fallita!")
 
@@ -248,7 +371,7 @@ def readnc_to_struct(
             grid_struct.ny = nc.dimensions["y"].size
         else:
             module_logger.exception("Non calcolo numero punti griglia")
-        module_logger.debug(f"Numero punti griglia nx={grid_struct.nx}, ny={grid_struct.ny}")
+        module_logger.debug("Numero punti griglia nx=%s, ny=%s", grid_struct.nx, grid_struct.ny)
     except Exception:
         module_logger.exception("Non calcolo numero punti griglia")
 
@@ -259,7 +382,7 @@ def readnc_to_struct(
     tmp_varx = [
         var for var in nc.variables if ((nc[var].size == grid_struct.nx) and ("standard_name" in nc[var].ncattrs()))
     ]
-    if tmp_varx != []:
+    if tmp_varx:
         n_typecoords_x = len(tmp_varx)
         campi_x = {}
         for v in tmp_varx:
@@ -274,9 +397,6 @@ def readnc_to_struct(
             if hasattr(nc[v], "long_name"):
                 xcoords_struct.long_name = nc[v].long_name
             campi_x[v] = xcoords_struct
-
-        if tmp_varx.__len__() == 1:
-            campi_x["COORDS_X"] = campi_x.pop(v)
     else:
         n_typecoords_x = 0
         module_logger.debug("struttura COORDS_X non definita")
@@ -284,7 +404,7 @@ def readnc_to_struct(
     tmp_vary = [
         var for var in nc.variables if ((nc[var].size == grid_struct.ny) and ("standard_name" in nc[var].ncattrs()))
     ]
-    if tmp_vary != []:
+    if tmp_vary:
         n_typecoords_y = len(tmp_vary)
         campi_y = {}
         for v in tmp_vary:
@@ -299,9 +419,6 @@ def readnc_to_struct(
             if hasattr(nc[v], "long_name"):
                 ycoords_struct.long_name = nc[v].long_name
             campi_y[v] = ycoords_struct
-
-        if tmp_vary.__len__() == 1:
-            campi_y["COORDS_Y"] = campi_y.pop(v)
     else:
         n_typecoords_y = 0
         module_logger.debug("struttura COORDS_Y non definita")
@@ -310,7 +427,7 @@ def readnc_to_struct(
 
     tmp_var = [var for var in nc.variables if (nc[var].shape == (nc["time"].size, grid_struct.ny, grid_struct.nx))]
 
-    if tmp_var != []:
+    if tmp_var:
         n_campi = len(tmp_var)
         campi = {}
         campi_data = {}
@@ -318,62 +435,54 @@ def readnc_to_struct(
 
             campo = StructVariable()
             campo.name = v
-            basic_attrs_list = [
-                "long_name",
-                "standard_name",
-                "units",
-                "min_val",
-                "max_val",
-                "missing",
-                "undetect",
-                "accum_time_h",
-            ]
-            for basic_att in basic_attrs_list:
-                if hasattr(nc[v], basic_att):
-                    try:
-                        campo.__setattr__(basic_att, getattr(nc[v], basic_att))
-                    except AttributeError:
-                        module_logger.warning(f"Non trovato attributo {basic_att}")
-                        pass
-            extra_params_var_search = [
-                "offset",
-                "scale_factor",
-                "n_byte",
-                "val_compresso",
-                "_FillValue",
-                "valid_min",
-                "valid_max",
-                "valid_range",
-                "var_missing",
-                "undetectable"
-            ]
-            for param_searched in extra_params_var_search:
-                if hasattr(nc[v], param_searched):
-                    try:
-                        campo.addparams(param_searched, nc[v].getncattr(param_searched))
-                    except Exception:
-                        # campo.addparams(param_searched, nc[v].__dict__[param_searched])
-                        module_logger.exception(
-                            f"param {param_searched} non trovato per var={v}.\nParametri disponibili:\n{nc[v].__dict__.items()}"
-                        )
+            # ncattrs() dice già quali attributi esistono: l'intersezione con le
+            # liste cercate evita il pattern hasattr+try/except per attributo
+            var_attrs = nc[v].__dict__
+            for basic_att in _BASIC_ATTRS & var_attrs.keys():
+                setattr(campo, basic_att, var_attrs[basic_att])
+            for param_searched in _EXTRA_PARAMS & var_attrs.keys():
+                campo._addparam_fast(param_searched, var_attrs[param_searched])
             try:
+                if not parallel and nc.file_format.startswith("NETCDF3"):
+                    # per i file NETCDF3 classic leggo il campo via mmap scipy
+                    # (una sola copia in float32, niente doppio parse netCDF4);
+                    # per variabili packed restituisce None e si decodifica sotto
+                    mm = _read_nc3_memmap(filename, v)
+                    if mm is not None:
+                        campi[v] = campo
+                        campi_data[v] = mm
+                        continue
+                # se la variabile è chunked, allargo la chunk cache HDF5 in modo che
+                # tutti i chunk del campo ci stiano: la lettura completa nc[v][:] non
+                # rilegge/decomprime così più volte lo stesso chunk.
+                # chunking() restituisce la lista dei chunk solo per variabili
+                # chunked netCDF4: per le contiguous vale "contiguous" e per i
+                # file netCDF3 None, casi in cui set_var_chunk_cache non è
+                # applicabile (su netCDF3 solleverebbe RuntimeError)
+                var_obj = nc[v]
+                if parallel:
+                    # lettura collettiva MPI-IO del campo intero
+                    var_obj.set_collective(True)
+                if isinstance(var_obj.chunking(), list):
+                    size_bytes = var_obj.size * var_obj.dtype.itemsize
+                    var_obj.set_var_chunk_cache(size=max(size_bytes, 1 << 20), nelems=4133, preemption=0.75)
                 campi[v] = campo
-                campi_data[v] = nc[v][:].data.astype(np.float32)
-                if n_campi == 1:
-                    campi["VARIABILE"] = campi.pop(v)
-                    campi_data["VARIABILE"] = campi_data.pop(v)
+                campi_data[v] = _cast_f32(nc[v][:])
             except Exception:
                 module_logger.exception("lettura campo dati fallita!")
 
     else:
         n_campi = 0
-        module_logger.warning([f"{var}.shape={nc[var].shape}, " for var in nc.variables])
-        module_logger.warning(f"nx={grid_struct.nx},ny={grid_struct.ny}")
+        if module_logger.isEnabledFor(logging.WARNING):
+            # la list comprehension accede a .shape di ogni variabile:
+            # la costruisco solo se il messaggio verrà effettivamente emesso
+            module_logger.warning("%s", [f"{var}.shape={nc[var].shape}, " for var in nc.variables])
+            module_logger.warning("nx=%s,ny=%s", grid_struct.nx, grid_struct.ny)
 
     """ __________________________________struttura PROJECTION__________________________________ """
 
     tmp_varp = [var for var in nc.variables if (nc[var].dtype == "S1")]
-    if tmp_varp != []:
+    if tmp_varp:
         n_stringvar = len(tmp_varp)
         if n_stringvar > 1:
             strvar_campi = {}
@@ -420,9 +529,10 @@ def readnc_to_struct(
                 # dell'istanza di pyproj, con il try successivo.
                 pass
             try:  # aggiungo il resto come extra params per replicare idl
-                for att_p in nc[p].ncattrs():
-                    if att_p not in list(proj_struct.__dict__.keys()) + ["mesh_dim", "geo_dim", "mesh_dim_units"]:
-                        setattr(proj_struct, att_p, nc[p].getncattr(att_p))
+                skip = set(proj_struct._struct_attrs()) | {"mesh_dim", "geo_dim", "mesh_dim_units"}
+                for att_p, val_p in nc[p].__dict__.items():
+                    if att_p not in skip:
+                        setattr(proj_struct, att_p, val_p)
             except (TypeError, AttributeError, IndexError):
                 pass
 
@@ -465,34 +575,111 @@ def readnc_to_struct(
     # dati_out: Dict[str, npt.NDArray[np.float32]] | npt.NDArray[np.float32] = np.empty(shape=(0), dtype=np.float32)
     dati_out: Union[Dict[str, np.ndarray], np.ndarray] = np.empty(shape=(0), dtype=np.float32)
 
-    # aggiungo sottostruttura/e VARIABILE
-    if n_campi > 0:
-
-        if n_campi == 1:
-            macro["VARIABILE"] = campi["VARIABILE"]
-            dati_out = campi_data["VARIABILE"]
-        else:
-            for key, val in campi.items():
-                macro[f"VARIABILE_{key}"] = val
-            dati_out = campi_data
+    # aggiungo sottostruttura/e VARIABILE; se la lettura di un campo è fallita
+    # campi può essere vuoto anche con n_campi >= 1: in quel caso niente
+    # next(iter(...)), che propagherebbe StopIteration da una funzione normale
+    if n_campi >= 1 and not campi:
+        module_logger.warning("nessun campo letto con successo (n_campi=%s)", n_campi)
+    elif n_campi == 1:
+        macro["VARIABILE"] = next(iter(campi.values()))
+        dati_out = next(iter(campi_data.values()))
+    elif n_campi > 1:
+        macro.update((f"VARIABILE_{key}", val) for key, val in campi.items())
+        dati_out = campi_data
     else:
         module_logger.warning(f"N_campi = {n_campi}")
 
     # aggiungo sottostruttura/e COORDS
-    if n_typecoords_x > 0:
-        for type_coord, xcoords in campi_x.items():
-            macro[type_coord] = xcoords
+    if n_typecoords_x == 1:
+        macro["COORDS_X"] = next(iter(campi_x.values()))
+    elif n_typecoords_x > 1:
+        macro.update(campi_x)
 
-    if n_typecoords_y > 0:
-        for type_coord, ycoords in campi_y.items():
-            macro[type_coord] = ycoords
+    if n_typecoords_y == 1:
+        macro["COORDS_Y"] = next(iter(campi_y.values()))
+    elif n_typecoords_y > 1:
+        macro.update(campi_y)
 
     # aggiungo sottostruttura/e di tipo str
-    if n_stringvar > 0:
-        if n_stringvar == 1:
-            macro["PROJECTION"] = proj_struct
-        else:
-            for key_, val_ in strvar_campi.items():
-                macro[key_] = val_
+    if n_stringvar == 1:
+        macro["PROJECTION"] = proj_struct
+    elif n_stringvar > 1:
+        macro.update(strvar_campi)
 
     return macro, dati_out
+
+
+# cache di processo dei risultati di _readnc_to_struct_impl: le pipeline a valle
+# riaprono spesso lo stesso file a pochi secondi di distanza (reload di config,
+# retry) e la cache evita di ripetere l'intero parsing netCDF/HDF5.
+_CACHE: "OrderedDict[Tuple[str, int, int], tuple]" = OrderedDict()
+_CACHE_MAXSIZE = 16
+
+
+def _copy_dati(dati_out: Union[Dict[str, np.ndarray], np.ndarray]) -> Union[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Copia la matrice (o il dizionario di matrici) dei dati prima di
+    restituirla dalla cache: i chiamanti modificano abitualmente il campo
+    in place e non devono corrompere l'entry condivisa.
+    """
+    if isinstance(dati_out, dict):
+        return {k: v.copy() for k, v in dati_out.items()}
+    return dati_out.copy()
+
+
+def readnc_to_struct(
+    filename: str,
+    parallel: bool = False,
+    comm=None,
+) -> Tuple[
+    Dict[
+        str,
+        Union[
+            StructBase,
+            StructTime,
+            StructGrid,
+            StructProjection,
+            StructSource,
+            StructProduct,
+            StructCoords,
+            StructVariable,
+        ],
+    ],
+    Union[Dict[str, np.ndarray], np.ndarray],
+]:
+
+    """
+    Wrapper di _readnc_to_struct_impl (che implementa la lettura vera e propria
+    e ne documenta input e output) con cache di processo dei risultati.
+
+    La cache è indicizzata da (path, mtime, size) del file, per cui una modifica
+    del file su disco invalida automaticamente l'entry; contiene al più
+    _CACHE_MAXSIZE risultati con rimpiazzo LRU. Ad ogni chiamata vengono
+    restituiti una copia shallow del dizionario macro e una copia della
+    matrice dei dati, così né le aggiunte di chiavi né le consuete modifiche
+    in place del campo (es. dati[dati < 0] = nan) da parte del chiamante
+    inquinano la cache. La lettura parallela MPI non viene mai messa in cache.
+    """
+
+    if parallel:
+        return _readnc_to_struct_impl(filename, parallel=parallel, comm=comm)
+
+    try:
+        st = os.stat(filename)
+        key = (filename, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return _readnc_to_struct_impl(filename)
+
+    hit = _CACHE.get(key)
+    if hit is not None:
+        _CACHE.move_to_end(key)
+        macro, dati_out = hit
+        return dict(macro), _copy_dati(dati_out)
+
+    macro, dati_out = _readnc_to_struct_impl(filename)
+    _CACHE[key] = (macro, dati_out)
+    if len(_CACHE) > _CACHE_MAXSIZE:
+        _CACHE.popitem(last=False)
+    # anche il primo chiamante riceve una copia: altrimenti le sue modifiche
+    # in place finirebbero nell'entry appena messa in cache
+    return dict(macro), _copy_dati(dati_out)
@@ -1,11 +1,11 @@
+import copy
+import os
 from datetime import datetime
 import numpy as np
 import logging
-import pyproj
-from math import cos, radians, pi, degrees
+from math import cos, radians, degrees, isqrt
 
 from simcradarlib.io_utils.structure_class import (
-    StructBase,
     StructTime,
     StructGrid,
     StructProjection,
@@ -14,29 +14,152 @@ from simcradarlib.io_utils.structure_class import (
     StructCoords,
     StructVariable,
 )
-from typing import Union, Dict, Tuple
+from typing import Dict, NamedTuple, Optional, Tuple
 
 module_logger = logging.getLogger(__name__)
 
 
-def read_zlr(
-    filename: str, radar: str
-) -> Tuple[
-    Dict[
-        str,
-        Union[
-            StructBase,
-            StructTime,
-            StructGrid,
-            StructProjection,
-            StructSource,
-            StructProduct,
-            StructCoords,
-            StructVariable,
-        ],
-    ],
-    np.ndarray,
-]:
+class MacroZlr(NamedTuple):
+
+    """
+    Macrostruttura tipata restituita da read_zlr: l'accesso per attributo
+    (macro.GRID) evita il lookup per chiave stringa del dizionario, ma
+    restano supportati sia macro["GRID"] sia macro.keys() per compatibilità
+    con i consumer che trattano la macrostruttura come dict
+    (es. get_meta_for_pysteps_from_macro).
+    """
+
+    TIME: StructTime
+    GRID: StructGrid
+    PROJECTION: StructProjection
+    SOURCE: StructSource
+    PRODUCT: StructProduct
+    VARIABILE: StructVariable
+    COORDS_X: StructCoords
+    COORDS_Y: StructCoords
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return self._fields
+
+try:
+    # opzionale: kernel jittato per la decodifica byte -> dBZ
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True, fastmath=True)
+    def _decode_zlr_kernel(raw, scale, offset, out):  # pragma: no cover
+        # fonde conversione uint8->float32, trasposta (ripiegata nel calcolo
+        # dell'indice) e trasformazione affine in un'unica passata parallela
+        n = out.shape[0]
+        for i in numba.prange(n):
+            for j in range(n):
+                out[i, j] = raw[j * n + i] * scale + offset
+
+# coordinate (lat, lon) del centro griglia per ciascun radar gestito
+_RADAR_CENTERS = {
+    "spc": (44.6547, 11.6236),
+    "gat": (44.7914, 10.4992),
+}
+
+# cache delle strutture PROJECTION/GRID/COORDS invarianti per (radar, n_grid)
+_GRID_CACHE: Dict[tuple, tuple] = {}
+
+# costanti di decodifica dei file ZLR: byte -> dBZ per Z_60, byte -> qualità
+# per qual_ZLR; centralizzano i valori magici ed evitano il re-boxing di
+# scalari np.float32 ad ogni chiamata
+_SCALE = np.float32(80.0 / 255.0)
+_OFFSET = np.float32(-20.0)
+_QUAL_SCALE = np.float32(0.01)
+_MISSING = np.float32(-20.0)
+_UNDETECT = np.float32(80.0 / 255.0 - 20.0)
+
+# (name, long_name) della variabile in funzione dell'estensione del file
+_VAR_BY_EXT = {
+    "ZLR": ("Z_60", "radar reflectivity"),
+    # per qual_ZLR ho riportato il valore di Map_type di idl, ma non so se va bene
+    "qual_ZLR": ("ZLR_QUA", "radar reflectivity quality"),
+}
+
+
+def _read_zlr_array(filename: str) -> Tuple[np.ndarray, int, Optional[str]]:
+
+    """
+    Legge e decodifica il solo campo dati di un file .ZLR/.qual_ZLR.
+    Restituisce la tupla (campo_data, n_grid, varname) dove campo_data è
+    l'array float32 di shape (1, n_grid, n_grid) e varname è il nome della
+    variabile decodificata ('Z_60', 'ZLR_QUA') o None se l'estensione non
+    è riconosciuta (nel qual caso campo_data è vuoto).
+    """
+
+    try:
+        # memory-map dei byte: il kernel pagina il file su richiesta e la
+        # conversione float avviene in un'unica passata vettorizzata, senza
+        # liste di interi Python nè buffer intermedi
+        raw = np.memmap(filename, dtype=np.uint8, mode="r")
+    except FileNotFoundError:
+        module_logger.exception(f"Non riesco a leggere il file di input {filename}")
+        raise
+    except (OSError, ValueError):
+        # alcuni filesystem non supportano mmap: vista zero-copy sui bytes
+        # letti, comunque senza il giro per la lista di interi Python
+        with open(filename, "rb") as f:
+            raw = np.frombuffer(f.read(), dtype=np.uint8)
+
+    # ricavo il numero di punti griglia in base alla dimensione dell'array che leggo dal file ZLR
+    # da n_grid ricavo il raggiotype. isqrt evita la sqrt float con troncamento
+    # e la validazione esplicita intercetta i file corrotti prima del reshape
+    n_grid = isqrt(raw.size)
+    if n_grid * n_grid != raw.size:
+        raise ValueError(f"dimensione inattesa del file ZLR {filename}: {raw.size} byte non è un quadrato perfetto")
+    if n_grid not in (256, 512):
+        module_logger.warning("numero nodi griglia inatteso: n_grid=%s (attesi 256 o 512)", n_grid)
+
+    var_info = _VAR_BY_EXT.get(os.path.splitext(filename)[1].lstrip("."))
+    varname = var_info[0] if var_info is not None else None
+
+    # la dimensione del payload è già stata validata, quindi la decodifica non
+    # può fallire sul reshape: niente try/except attorno al percorso caldo
+    if varname == "Z_60":
+        # unica passata: trasformazione affine scritta direttamente nel
+        # buffer float32 di output. Il reshape con order='F' equivale alla
+        # trasposta del reshape C (il file è scritto in C) senza copia.
+        campo_data = np.empty((1, n_grid, n_grid), dtype=np.float32)
+        if numba is not None:
+            _decode_zlr_kernel(np.ascontiguousarray(raw), _SCALE, _OFFSET, campo_data[0])
+        else:
+            np.multiply(raw.reshape((n_grid, n_grid), order="F"), _SCALE, out=campo_data[0])
+            campo_data[0] += _OFFSET
+    elif varname == "ZLR_QUA":
+        campo_data = np.empty((1, n_grid, n_grid), dtype=np.float32)
+        np.multiply(raw.reshape((n_grid, n_grid)), _QUAL_SCALE, out=campo_data[0])
+    else:
+        module_logger.warning("Estensione file non riconosciuta: campo dati vuoto")
+        campo_data = np.empty((0,), dtype=np.float32)
+
+    return campo_data, n_grid, varname
+
+
+def read_zlr_data(filename: str) -> np.ndarray:
+
+    """
+    Variante leggera di read_zlr che restituisce solo il campo dati float32
+    di shape (1, n_grid, n_grid), senza costruire la macrostruttura delle
+    informazioni: utile per l'estrazione massiva quando al chiamante non
+    servono le strutture di proiezione/griglia/coordinate.
+    """
+
+    return _read_zlr_array(filename)[0]
+
+
+def read_zlr(filename: str, radar: str) -> Tuple[MacroZlr, np.ndarray]:
 
     """
      Funzione che legge un file binario di estensione .ZLR o .qual_ZLR e restituisce in output
@@ -55,9 +178,9 @@ def read_zlr(
      - radar            --str     :  nome del radar sorgente ('spc' o 'gat').
      ______
      OUTPUT:
-     - macro            --dict    :  dizionario avente come values le strutture contenenti
-                                     le informazioni sui dati e come chiavi stringhe identificative
-                                     del tipo di informazioni contenute nelle strutture.
+     - macro            --MacroZlr :  namedtuple tipata avente come campi le strutture contenenti
+                                     le informazioni sui dati; supporta anche l'accesso per chiave
+                                     stringa e .keys() come un dizionario.
                                      Tali strutture sono istanze delle classi definite in
                                      structure_class.py.
 
@@ -120,90 +243,62 @@ def read_zlr(
                                      del campo letto. nx = ny = n_grid.
                                      Se n_grid=256 -> raggiotype=corto, se n_grid=512 -> raggiotype=medio.
 
-    - projstring        --str      : stringa di proiezione usata da pyproj.
-
-    - dy, dx            --float    : risoluzioni verticale e orizzontale proiettate in km.
-
-    - x1,x2,y1,y2       --float    : estremi del grigliato proiettati in km.
-
-    - lat1,lat2,lon1,lon2   --float  : estremi del grigliato riproiettati in lat-lon regolare.
+    - half_lon,half_lat --float    : semiestensione del grigliato in gradi rispetto al centro;
+                                     per la proiezione equirettangolare gli estremi del grigliato
+                                     si ottengono in forma chiusa come centro +/- semiestensione.
 
     """
 
-    if radar.lower() == "spc":
-        latc = 44.6547
-        lonc = 11.6236
-    elif radar.lower() == "gat":
-        latc = 44.7914
-        lonc = 10.4992
+    center = _RADAR_CENTERS.get(radar.lower())
+    if center is not None:
+        latc, lonc = center
     else:
         module_logger.warning("Radar non specificato")
+        latc = lonc = float("nan")
 
-    try:
-        f = open(filename, "rb")
-        cont = list(f.read())
-        f.close()
-    except FileNotFoundError:
-        module_logger.exception(f"Non riesco a leggere il file di input {filename}")
-
-    # ricavo il numero di punti griglia in base alla dimensione dell'array che leggo dal file ZLR
-    # da n_grid ricavo il raggiotype
-    try:
-        n_grid = int(np.sqrt(len(cont)))
-    except Exception:
-        module_logger.exception("numero nodi griglia non calcolato")
+    campo_data, n_grid, _ = _read_zlr_array(filename)
 
     """ __________________________________struttura VARIABILE__________________________________ """
 
     campo = StructVariable()
 
-    splitter_filename = filename.split(".")
-    if splitter_filename[-1] == "ZLR":
-        campo.name = "Z_60"
-        campo.long_name = "radar reflectivity"
-        campo.missing = np.float32(-20.0)
-        campo.undetect = np.float32(80.0 / 255.0 - 20.0)
-        campo.units = "dBZ"
-    elif splitter_filename[-1] == "qual_ZLR":
-        campo.name = "ZLR_QUA"  # ho riportato il valore di Map_type di idl, ma non so se va bene
-        campo.long_name = "radar reflectivity quality"
-        campo.missing = np.float32(-20.0)
-        campo.undetect = np.float32(80.0 / 255.0 - 20.0)
+    # splitext/basename: una sola scansione dalla fine e comportamento corretto
+    # anche con directory contenenti punti nel path
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    var_info = _VAR_BY_EXT.get(ext.lstrip("."))
+    if var_info is not None:
+        campo.name, campo.long_name = var_info
+        campo.missing = _MISSING
+        campo.undetect = _UNDETECT
         campo.units = "dBZ"
 
-    try:
-        if campo.name == "Z_60":
-            campo_data = (
-                np.array([float(k) for k in cont], dtype=np.float32).reshape((n_grid, n_grid)).T
-            )  # trasposta in quanto scritta in C
-            campo_data = campo_data * 80.0 / 255.0 - 20
-        elif campo.name == "ZLR_QUA":
-            campo_data = np.array([float(k) for k in cont], dtype=np.float32).reshape((n_grid, n_grid)) * 0.01
-        campo_data = np.expand_dims(campo_data, axis=0)  # se voglio shape (1,ngrid,ngrid) e non (ngrid,ngrid)
-    except Exception:
-        module_logger.exception("Non riesco a fare la trasposta del campo letto")
-        campo_data = np.empty((0,), dtype=np.float32)
+    """ ____________________strutture PROJECTION, GRID e COORDS (invarianti)____________________
+        Per un dato (radar, n_grid) proiezione, limiti griglia e coordinate sono
+        identici per ogni file: vengono calcolati alla prima chiamata e poi
+        riusati dalla cache _GRID_CACHE (copie shallow, con array condivisi in
+        sola lettura).
+    """
 
-    """ __________________________________struttura PROJECTION__________________________________ """
+    cache_key = (radar.lower(), n_grid)
+    cached = _GRID_CACHE.get(cache_key)
+    if cached is not None:
 
-    proj_struct = StructProjection()
+        proj_struct, grid_struct, xcoords_struct, ycoords_struct = (copy.copy(s) for s in cached)
+
+    else:
+
+        proj_struct = StructProjection()
 
-    try:
         proj_struct.center_latitude = latc
         proj_struct.center_longitude = lonc
-        # proj_struct.proj_id = 0 # setto default 0 perchè ho visto che nei netCDF delle cumulate dei radar singoli
-        # si usa cmq lat-lon regolare e non azimuthal equidistant
-        proj_struct.addparams("proj_id", 0)
+        # proj_struct.proj_id = 0 # setto default 0 perchè ho visto che nei netCDF delle cumulate dei radar
+        # singoli si usa cmq lat-lon regolare e non azimuthal equidistant
+        proj_struct._addparam_fast("proj_id", 0)
         proj_struct.proj_name = "Cartesian LatLon"
         proj_struct.earth_radius = 6370.997
-    except Exception:
-        module_logger.exception("Lettura proiezione fallita")
-
-    """ __________________________________struttura GRID__________________________________ """
 
-    grid_struct = StructGrid()
+        grid_struct = StructGrid()
 
-    try:
         grid_struct.nx = n_grid
         grid_struct.ny = n_grid
         if proj_struct.proj_id == 0:
@@ -211,57 +306,52 @@ def read_zlr(
             grid_struct.dy = degrees(1.0 / proj_struct.earth_radius)
             grid_struct.units_dx = "degrees"
             grid_struct.units_dy = "degrees"
-            projstring = f"+proj=eqc +lat_0={latc:.4f} +lon_0={lonc:.4f} +ellps=WGS84 +R={proj_struct.earth_radius:.4f}"
+            # per la proiezione equirettangolare l'andata e ritorno pyproj
+            # (centro -> metri -> angoli della griglia -> lat-lon) si riduce
+            # in forma chiusa a +/-(n-1)/2 passi di griglia attorno al centro
+            half_lon = (grid_struct.nx - 1) * 0.5 * grid_struct.dx
+            half_lat = (grid_struct.ny - 1) * 0.5 * grid_struct.dy
+            grid_struct.limiti = np.array(
+                [latc - half_lat, lonc - half_lon, latc + half_lat, lonc + half_lon], dtype=np.float32
+            )
         else:
             module_logger.warning("proj_id non 0! Verificare proiezione!")
-        p = pyproj.Proj(projstring)
-
-        dy = 2 * pi * proj_struct.earth_radius * grid_struct.dy / 360.0  # *1000
-        dx = 2 * pi * proj_struct.earth_radius * grid_struct.dx / 360.0  # *1000
-        xc, yc = p(lonc, latc)
-        x0 = xc - (grid_struct.nx - 1) * 0.5 * dx
-        x1 = xc + (grid_struct.nx - 1) * 0.5 * dx
-        y0 = yc - (grid_struct.ny - 1) * 0.5 * dy
-        y1 = yc + (grid_struct.ny - 1) * 0.5 * dy
-
-        lon1, lat1 = p(x0, y0, inverse=True)
-        lon2, lat2 = p(x1, y1, inverse=True)
 
-        grid_struct.limiti = np.array([lat1, lon1, lat2, lon2], dtype=np.float32)
-    except Exception:
-        module_logger.exception("Lettura proiezione fallita")
+        xcoords_struct = StructCoords()
 
-    """ __________________________________struttura COORDS__________________________________ """
-
-    xcoords_struct = StructCoords()
-
-    try:
         if proj_struct.proj_id == 0:
             xcoords_struct.name = "lon"
             xcoords_struct.long_name = "longitude"
             xcoords_struct.units = "degrees"
-            xcoords_struct.vals = np.linspace(grid_struct.limiti[1], grid_struct.limiti[3], grid_struct.nx)
-    except Exception:
-        module_logger.exception("Lettura xcoord non eseguita")
-        pass
+            xcoords_struct.vals = np.linspace(
+                grid_struct.limiti[1], grid_struct.limiti[3], grid_struct.nx, dtype=np.float32
+            )
 
-    ycoords_struct = StructCoords()
+        ycoords_struct = StructCoords()
 
-    try:
         if proj_struct.proj_id == 0:
             ycoords_struct.name = "lat"
             ycoords_struct.long_name = "latitude"
             ycoords_struct.units = "degrees"
-            ycoords_struct.vals = np.linspace(grid_struct.limiti[0], grid_struct.limiti[2], grid_struct.ny)
-    except Exception:
-        module_logger.exception("Lettura ycoord non eseguita")
-        pass
+            ycoords_struct.vals = np.linspace(
+                grid_struct.limiti[0], grid_struct.limiti[2], grid_struct.ny, dtype=np.float32
+            )
+
+        _GRID_CACHE[cache_key] = (
+            copy.copy(proj_struct),
+            copy.copy(grid_struct),
+            copy.copy(xcoords_struct),
+            copy.copy(ycoords_struct),
+        )
 
     """ __________________________________struttura TIME__________________________________ """
 
     time_struct = StructTime()
 
-    time_struct.date_time_validita = datetime.strptime(splitter_filename[0][-12:], "%Y%m%d%H%M")
+    # parsing manuale del timestamp YYYYmmddHHMM: evita il costo del parsing
+    # della format string di strptime ad ogni chiamata
+    s = stem[-12:]
+    time_struct.date_time_validita = datetime(int(s[0:4]), int(s[4:6]), int(s[6:8]), int(s[8:10]), int(s[10:12]))
     time_struct.date_time_emissione = time_struct.date_time_validita
 
     """ __________________________________struttura PRODUCT__________________________________ """
@@ -269,14 +359,11 @@ def read_zlr(
     struct_product = StructProduct()
 
     struct_product.name = "ZLR"
-    struct_product.addparams("radar", radar)
-    try:
-        if n_grid == 256:
-            struct_product.addparams("raggio", "corto")
-        elif n_grid == 512:
-            struct_product.addparams("raggio", "medio")
-    except Exception:
-        module_logger.exception("Calcolo raggiotype fallito")
+    struct_product._addparam_fast("radar", radar)
+    if n_grid == 256:
+        struct_product._addparam_fast("raggio", "corto")
+    elif n_grid == 512:
+        struct_product._addparam_fast("raggio", "medio")
 
     """ __________________________________struttura SOURCE__________________________________ """
 
@@ -285,15 +372,17 @@ def read_zlr(
     struct_source.name_source = radar
     struct_source.name_file = filename
 
-    macro = {
-        "TIME": time_struct,
-        "GRID": grid_struct,
-        "PROJECTION": proj_struct,
-        "SOURCE": struct_source,
-        "PRODUCT": struct_product,
-        "VARIABILE": campo,
-        "COORDS_X": xcoords_struct,
-        "COORDS_Y": ycoords_struct,
-    }
-
-    return macro, campo_data.astype(np.float32)
+    macro = MacroZlr(
+        TIME=time_struct,
+        GRID=grid_struct,
+        PROJECTION=proj_struct,
+        SOURCE=struct_source,
+        PRODUCT=struct_product,
+        VARIABILE=campo,
+        COORDS_X=xcoords_struct,
+        COORDS_Y=ycoords_struct,
+    )
+
+    # campo_data è già float32 in tutti i rami (incluso quello di errore):
+    # nessuna copia difensiva astype al ritorno
+    return macro, campo_data
@@ -1,7 +1,13 @@
+import functools
 import numpy as np
-from typing import Optional, Iterable, Any, Union
+from typing import Dict, Optional, Iterable, Any, Tuple, Union
 from datetime import datetime
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 """
 Sono definite le classi usate per la lettura delle variabili del file ncdf, bufr in modo da ottenere
 le relative info e i dati in una struttura analoga a quella di IDL.
@@ -17,8 +23,15 @@ class StructBase:
     E' la classe base da cui ereditano quasi tutte le classi definite nella libreria,
     in quanto non ha parametri per il costruttore ma solo metodi per l'assegnazione
     di attributi e l'ispezione degli attributi di istanza.
+
+    Le classi figlie dichiarano in __slots__ gli attributi noti a priori, per ridurre
+    l'occupazione di memoria e velocizzare l'accesso agli attributi; lo slot "__dict__"
+    dichiarato qui mantiene comunque la possibilità di aggiungere attributi dinamici
+    con addparams.
     """
 
+    __slots__ = ("__dict__",)
+
     def __init__(self):
 
         pass
@@ -45,14 +58,22 @@ class StructBase:
             istanza.addparams(newparams=["attr1","attr2"],value=[0,1])
         """
 
-        if type(newparam) == str:
+        if isinstance(newparam, str):
             setattr(self, newparam, value)
-        elif type(newparam) == list:
+        else:
             for k, v in zip(newparam, value):
-                self.__dict__[k] = v
+                setattr(self, k, v)
 
         return None
 
+    def _addparam_fast(self, name: str, value: Any) -> None:
+        """
+        Variante fast-path di addparams per il caso comune di una singola coppia
+        (nome,valore): esegue direttamente setattr senza il dispatch sul tipo
+        del primo argomento. Usata nei percorsi caldi di lettura.
+        """
+        setattr(self, name, value)
+
     def struct_getitem(self, param: str) -> Any:
         """
         Metodo di istanza della classe StructBase che restituisce il valore dell'attributo
@@ -72,8 +93,13 @@ class StructBase:
             e attributo1 sarà uguale a 0 in questo caso.
         """
 
-        if param in self.__dict__.keys():
-            return self.__dict__[param]
+        # fast path per gli attributi dinamici, poi il controllo condiviso con
+        # struct_hasitem: i default a livello di classe non vengono restituiti
+        val = self.__dict__.get(param)
+        if val is not None:
+            return val
+        if self.struct_hasitem(param):
+            return getattr(self, param)
         return None
 
     def struct_hasitem(self, param: str) -> bool:
@@ -91,13 +117,51 @@ class StructBase:
             istanza.addparams(newparams="attributo1",value=0)
             istanza.struct_hasitem("attributo1") --> l'output è True
         """
-        if param in self.__dict__.keys():
+
+        if param in self.__dict__:
             return True
+        # gli attributi dichiarati negli __slots__ esistono solo se assegnati
+        # sull'istanza; i default a livello di classe (es. projection_index di
+        # StructProjection) restano esclusi, come da contratto storico
+        for klass in type(self).__mro__:
+            slots = getattr(klass, "__slots__", ())
+            if param in slots and param != "__dict__":
+                return hasattr(self, param)
         return False
 
+    def _struct_attrs(self) -> Dict[str, Any]:
+        """
+        Metodo di istanza della classe StructBase che restituisce il dizionario
+        nome->valore degli attributi assegnati all'istanza, sia quelli dichiarati
+        negli __slots__ delle classi della gerarchia sia quelli dinamici aggiunti
+        con addparams.
+
+        OUTPUT:
+                --Dict[str,Any] : dizionario degli attributi dell'istanza.
+        """
+        out: Dict[str, Any] = {}
+        for klass in reversed(type(self).__mro__):
+            for slot in getattr(klass, "__slots__", ()):
+                if slot != "__dict__" and hasattr(self, slot):
+                    out[slot] = getattr(self, slot)
+        out.update(self.__dict__)
+        return out
+
 
 class StructVariable(StructBase):
 
+    __slots__ = (
+        "name",
+        "long_name",
+        "standard_name",
+        "units",
+        "min_val",
+        "max_val",
+        "missing",
+        "undetect",
+        "color_table",
+    )
+
     accum_time_h: Optional[float] = None
 
     __doc__ =  """
@@ -167,6 +231,14 @@ class StructVariable(StructBase):
         self.undetect = undetect
         self.color_table = color_table
 
+    def __init_subclass__(cls, **kwargs):
+        # Le classi figlie assegnano 'name' solo nel costruttore, quindi non è
+        # noto al momento della definizione della classe: qui invalido l'indice
+        # nome->classe memoizzato, che viene ricostruito alla prima lookup
+        # successiva includendo la nuova classe figlia.
+        super().__init_subclass__(**kwargs)
+        _varname_index.cache_clear()
+
     @classmethod
     def set_cls_by_name(cls, varname: Optional[str] = None):
         """
@@ -205,14 +277,12 @@ class StructVariable(StructBase):
                             radar desiderata, identificata come quella che ha attributo
                             'name' pari al parametro in input varname.
         """
-        outcls = None
-        if varname is not None:
-            subclasses = list(cls.__subclasses__()).copy()
-            for subcls in subclasses:
-                outcls = subcls()
-                if outcls.name == varname:
-                    break
-        return outcls
+        if varname is None:
+            return None
+        subcls = _varname_index().get(varname)
+        if subcls is None:
+            return None
+        return subcls()
 
     def set_var_by_name(self, varname: Optional[str]) -> None:
         """
@@ -242,7 +312,7 @@ class StructVariable(StructBase):
         Creo l'istanza della classe StructVariable senza specificare parametri in input
 
         >>myvar=simcradarlib.io_utils.structure_class.StructVariable()
-        >>myvar.__dict__.items()
+        >>myvar._struct_attrs().items()
         dict_items([('name', None), ('long_name', None), ('standard_name', None), ('units', None),
         ('min_val', None), ('max_val', None), ('missing', None), ('undetect', None),
         ('color_table', None)])
@@ -251,7 +321,7 @@ class StructVariable(StructBase):
         implementare la riflettività
 
         >>myvar.set_var_by_name("Z_60")
-        >>myvar.__dict__.items()
+        >>myvar._struct_attrs().items()
         dict_items([('name', 'Z_60'), ('long_name', 'Radar reflectivity factor'), ('standard_name',
         None), ('units', 'dBZ'), ('min_val', -19.69), ('max_val', 60.0), ('missing', -20.0),
         ('undetect', -19.69), ('color_table', 'RGB_Z.txt')])
@@ -259,13 +329,33 @@ class StructVariable(StructBase):
         """
         if varname is not None:
             clsvar = self.set_cls_by_name(varname)
-            self.addparams(newparam=list(clsvar.__dict__.keys()), value=list(clsvar.__dict__.values()))
+            if clsvar is not None:
+                for k, v in clsvar._struct_attrs().items():
+                    setattr(self, k, v)
 
         return
 
 
+@functools.lru_cache(maxsize=None)
+def _varname_index() -> Dict[str, type]:
+    """
+    Costruisce (una sola volta, memoizzato con lru_cache) il dizionario
+    nome variabile -> classe figlia di StructVariable, istanziando ciascuna
+    classe figlia una volta per leggerne l'attributo 'name', assegnato
+    nel costruttore.
+    """
+    index: Dict[str, type] = {}
+    for subcls in StructVariable.__subclasses__():
+        inst = subcls()
+        if inst.name is not None and inst.name not in index:
+            index[inst.name] = subcls
+    return index
+
+
 class StructCoords(StructBase):
 
+    __slots__ = ("name", "long_name", "units", "vals")
+
     __doc__ =  """
     Classe figlia di StructBase con attributi dell'istanza:
 
@@ -300,6 +390,8 @@ class StructCoords(StructBase):
 
 class StructGrid(StructBase):
 
+    __slots__ = ("limiti", "dx", "dy", "units_dx", "units_dy", "nx", "ny", "name")
+
     # nx:Optional[int] = None
     # ny:Optional[int] = None
     nx: int
@@ -325,7 +417,7 @@ class StructGrid(StructBase):
 
     def __init__(
         self,
-        limiti: np.ndarray = np.array([None, None, None, None]),
+        limiti: Optional[np.ndarray] = None,
         dx: Optional[float] = None,
         dy: Optional[float] = None,
         units_dx: Optional[str] = None,
@@ -333,7 +425,9 @@ class StructGrid(StructBase):
     ):
 
         super().__init__()
-        self.limiti = limiti
+        # np.full evita il default mutabile condiviso tra le istanze e l'array
+        # object-dtype di None, mantenendo l'aritmetica su limiti in float64.
+        self.limiti = np.full(4, np.nan) if limiti is None else limiti
         self.dx = dx
         self.dy = dy
         self.units_dx = units_dx
@@ -345,18 +439,63 @@ class StructGrid(StructBase):
         x e y della griglia usata e li aggiunge agli attributi dell'istanza della classe.
         """
 
-        # nx = int(round((self.limiti[3] - self.limiti[1]) / self.dx, 1)) + 1
-        # ny = int(round((self.limiti[2] - self.limiti[0]) / self.dy, 1)) + 1
-        nx = int(round((self.limiti[3] - self.limiti[1]) / self.dx)) + 1
-        ny = int(round((self.limiti[2] - self.limiti[0]) / self.dy)) + 1
-        setattr(self, "nx", nx)
-        setattr(self, "ny", ny)
+        # estraggo gli estremi come float Python in un colpo solo, evitando il
+        # dispatch object-dtype se limiti arriva come array di object
+        y_min, x_min, y_max, x_max = np.asarray(self.limiti, dtype=np.float64).tolist()
+        nx = int(round((x_max - x_min) / self.dx)) + 1
+        ny = int(round((y_max - y_min) / self.dy)) + 1
+        self.nx = nx
+        self.ny = ny
 
         return None
 
 
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _compute_nxny_kernel(limiti, dx, dy):  # pragma: no cover
+        n = limiti.shape[0]
+        nx = np.empty(n, np.int64)
+        ny = np.empty(n, np.int64)
+        for i in range(n):
+            nx[i] = int(round((limiti[i, 3] - limiti[i, 1]) / dx[i])) + 1
+            ny[i] = int(round((limiti[i, 2] - limiti[i, 0]) / dy[i])) + 1
+        return nx, ny
+
+
+def numero_punti_griglia_batch(limiti: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcola in un colpo solo il numero di punti griglia sull'asse x e y per un
+    insieme di N griglie (es. composizione di mosaici), evitando il loop Python
+    su StructGrid.numero_punti_griglia per ogni griglia.
+
+    INPUT:
+    - limiti  --np.ndarray((N,4)) : estremi delle griglie, per ciascuna riga
+                                    nell'ordine [y_min, x_min, y_max, x_max].
+    - dx      --np.ndarray((N,))  : passo griglia sull'asse x di ciascuna griglia.
+    - dy      --np.ndarray((N,))  : passo griglia sull'asse y di ciascuna griglia.
+
+    OUTPUT:
+    - (nx,ny) --Tuple[np.ndarray((N,)),np.ndarray((N,))] : numero di punti griglia
+                                    sull'asse x e y di ciascuna griglia.
+
+    Se numba è installato il calcolo usa un kernel compilato, altrimenti una
+    espressione NumPy vettorizzata equivalente.
+    """
+    limiti = np.ascontiguousarray(limiti, dtype=np.float64).reshape(-1, 4)
+    dx = np.ascontiguousarray(dx, dtype=np.float64).reshape(-1)
+    dy = np.ascontiguousarray(dy, dtype=np.float64).reshape(-1)
+    if numba is not None:
+        return _compute_nxny_kernel(limiti, dx, dy)
+    nx = np.rint((limiti[:, 3] - limiti[:, 1]) / dx).astype(np.int64) + 1
+    ny = np.rint((limiti[:, 2] - limiti[:, 0]) / dy).astype(np.int64) + 1
+    return nx, ny
+
+
 class StructProjection(StructBase):
 
+    __slots__ = ("center_longitude", "center_latitude", "proj_name", "earth_radius")
+
     proj_id: Optional[int] = None
     projection_index: Optional[int] = None
     projection_name: str = "None"
@@ -394,6 +533,8 @@ class StructProjection(StructBase):
 
 class StructProduct(StructBase):
 
+    __slots__ = ("name", "long_name")
+
     __doc__ = """
     Classe figlia di StructBase con attributi dell'istanza:
 
@@ -416,6 +557,8 @@ class StructProduct(StructBase):
 
 class StructTime(StructBase):
 
+    __slots__ = ("date_time_validita", "date_time_emissione", "acc_time", "acc_time_unit")
+
     __doc__ = """
     Classe figlia di StructBase con attributi dell'istanza:
 
@@ -449,6 +592,8 @@ class StructTime(StructBase):
 
 class StructSource(StructBase):
 
+    __slots__ = ("name_source", "name_file", "commento", "quality_file")
+
     __doc__ = """
     Classe figlia di StructBase con attributi dell'istanza:
 
@@ -480,8 +625,33 @@ class StructSource(StructBase):
         self.commento = commento
 
 
+_RADPROD_LONG_NAMES = {
+    "SRI": "Surface Radar Rainfall Intensity",
+    "SRT": "Surface Radar Rainfall Accumulation",
+    "CAPPI": "Constant Altitude PPI",
+    "MAX": "Maximum Vertical Projection",
+    "PPI": "Plan Position Indicator",
+    "LBM": "Lowest Beam Map Reflectivity",
+    "BEAM": "Radar Beam",
+    "RHI": "Range-Height Indicator",
+    "XSEC": "Vertical Section",
+    "ETOP": "Echo Top",
+    "HSP": "HVMI horizontal panel",  # HVIM??
+    "VSP": "HVIM vertical panel",
+    "VIL": "Vertical Integrated Liquid Water",
+    "CLASS_CONV": "Convective-stratiform classification",
+    "POH_ARPA": "Probability of hail",
+    "VID": "Vil density - hail size",
+    "SURF": "Surface field",
+    "COMP": "Cartesian composite image",
+    "RR": "Accumulation",
+}
+
+
 class RadarProduct(StructProduct):
 
+    __slots__ = ()
+
     __doc__ = """
     Classe figlia di StructProduct per implementare i prodotti radar e
     sostituisce la tabella /autofs/radar/radar/file_x_idl/tabelle/prodotti.txt
@@ -496,10 +666,10 @@ class RadarProduct(StructProduct):
 
     Se viene creata l'istanza di classe RadarProduct senza specificare long_name
     nell'inizializzazione, tale attributo viene settato pari al valore della chiave
-    corrispondente all'attributo 'name' nel dizionario 'dict_radprods', definito
-    nel costruttore come variabile di istanza.
+    corrispondente all'attributo 'name' nel dizionario '_RADPROD_LONG_NAMES',
+    definito come costante a livello di modulo.
 
-    dict_radprods = {
+    _RADPROD_LONG_NAMES = {
             "SRI": "Surface Radar Rainfall Intensity",
             "SRT": "Surface Radar Rainfall Accumulation",
             "CAPPI": "Constant Altitude PPI",
@@ -529,29 +699,8 @@ class RadarProduct(StructProduct):
 
     def __init__(self, name: str = "None", long_name: str = "None"):
         super().__init__(name, long_name)
-        self.name = name
-        self.long_name = long_name
 
-        dict_radprods = {
-            "SRI": "Surface Radar Rainfall Intensity",
-            "SRT": "Surface Radar Rainfall Accumulation",
-            "CAPPI": "Constant Altitude PPI",
-            "MAX": "Maximum Vertical Projection",
-            "PPI": "Plan Position Indicator",
-            "LBM": "Lowest Beam Map Reflectivity",
-            "BEAM": "Radar Beam",
-            "RHI": "Range-Height Indicator",
-            "XSEC": "Vertical Section",
-            "ETOP": "Echo Top",
-            "HSP": "HVMI horizontal panel",  # HVIM??
-            "VSP": "HVIM vertical panel",
-            "VIL": "Vertical Integrated Liquid Water",
-            "CLASS_CONV": "Convective-stratiform classification",
-            "POH_ARPA": "Probability of hail",
-            "VID": "Vil density - hail size",
-            "SURF": "Surface field",
-            "COMP": "Cartesian composite image",
-            "RR": "Accumulation",
-        }
-        if self.name != "None" and self.long_name == "None" and self.name in dict_radprods.keys():
-            self.long_name = dict_radprods[self.name]
+        if self.name != "None" and self.long_name == "None":
+            long_name_tab = _RADPROD_LONG_NAMES.get(self.name)
+            if long_name_tab is not None:
+                self.long_name = long_name_tab
@@ -4,6 +4,9 @@ from typing import Optional
 
 module_logger = logging.getLogger(__name__)
 
+# binding a livello di modulo: evita il LOAD_ATTR su datetime ad ogni chiamata
+_now = datetime.now
+
 
 def log_endprocess_info(start_time: datetime) -> None:
 
@@ -16,18 +19,12 @@ def log_endprocess_info(start_time: datetime) -> None:
 
     OUTPUT :  None
     """
-    end_time = datetime.now()
-    diff = end_time - start_time
-    try:
-        diff_sec = diff.total_seconds()
-    except AttributeError:
-
-        def total_seconds(td):
-            return float((td.microseconds + (td.seconds + td.days * 24 * 3600) * 10**6)) / 10**6
-
-        diff_sec = total_seconds(diff)
-    module_logger.debug(f"Durata processo: {diff_sec} secondi")
-    module_logger.debug(f"################ FINE OPERAZIONI - {end_time} ########################")
+    if not module_logger.isEnabledFor(logging.DEBUG):
+        return
+    end_time = _now()
+    diff_sec = (end_time - start_time).total_seconds()
+    module_logger.debug("Durata processo: %s secondi", diff_sec)
+    module_logger.debug("################ FINE OPERAZIONI - %s ########################", end_time)
 
 
 def log_subprocess_info(t_start_processo: datetime) -> None:
@@ -44,14 +41,5 @@ def log_subprocess_info(t_start_processo: datetime) -> None:
     OUTPUT:None
     """
 
-    partial_time = datetime.now()
-    diff = partial_time - t_start_processo
-    try:
-        diff_sec = diff.total_seconds()
-    except AttributeError:
-
-        def total_seconds(td):
-            return float((td.microseconds + (td.seconds + td.days * 24 * 3600) * 10**6)) / 10**6
-
-        diff_sec = total_seconds(diff)
-    module_logger.info(f"Durata processo: {diff_sec} secondi")
+    diff_sec = (_now() - t_start_processo).total_seconds()
+    module_logger.info("Durata processo: %s secondi", diff_sec)
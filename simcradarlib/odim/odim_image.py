@@ -1,4 +1,6 @@
 from simcradarlib.odim.odim_utils import (
+    ODIM_RDCC_NBYTES,
+    ODIM_RDCC_NSLOTS,
     OdimDset8bImage,
     OdimWhat,
     OdimWhereGeoimage,
@@ -7,6 +9,7 @@ from simcradarlib.odim.odim_utils import (
 )
 from simcradarlib.io_utils.structure_class import StructBase
 import h5py
+import numpy as np
 from typing import Union
 
 
@@ -74,6 +77,8 @@ class OdimHierarchyImage(StructBase):
         |              - {attributi di classe OdimHow}
     """
 
+    __slots__ = ("root_what", "root_where", "root_how", "group_dataset_what", "dataset", "group_data_what")
+
     root_what: OdimWhat
     root_where: OdimWhereGeoimage
     root_how: OdimHow
@@ -114,16 +119,21 @@ class OdimHierarchyImage(StructBase):
         self.root_where = root_where
         self.root_how = root_how
         self.dataset = dataset
+        # fisso qui il livello gerarchico del dataset, così export_odim può
+        # riusare direttamente l'istanza senza rincapsulare i dati
+        self.dataset.hierarchy = "dataset1/data1/data"
         self.group_data_what = group_data_what
         self.group_dataset_what = group_dataset_what
 
-        # verifico che la matrice dei dati sia 2D
-        assert self.dataset.data.shape.__len__() == 2
+        # verifico che la matrice dei dati sia 2D (check esplicito, attivo
+        # anche con python -O a differenza di assert)
+        if self.dataset.data.ndim != 2:
+            raise ValueError(f"il dataset di un ODIM IMAGE deve essere 2D, ricevuto ndim={self.dataset.data.ndim}")
 
     def get_attrs_from_odimgroup(
         self,
         attrs_list: list,
-        hgroup: h5py._hl.group.Group,
+        hgroup: Union[h5py._hl.group.Group, dict],
         out_cont: Union[OdimDset8bImage, OdimWhat, OdimHow, OdimWhereGeoimage, OdimWhatDset],
     ) -> None:
 
@@ -136,9 +146,10 @@ class OdimHierarchyImage(StructBase):
         -attrs_list    --list : Lista di attributi da leggere nel file ODIM.
                                 Possono essere attributi di un oggetto gruppo
                                 o di un oggetto dataset.
-        -hgroup        --h5py._hl.group.Group :
+        -hgroup        --Union[h5py._hl.group.Group,dict] :
                                 oggetto Group di h5py corrispondente al
-                                gruppo ODIM di cui voglio leggere gli attributi.
+                                gruppo ODIM di cui voglio leggere gli attributi,
+                                oppure il dict dei suoi attributi già materializzato.
         -out_cont      --Union[ OdimDset8bImage, OdimWhat, OdimHow,
                                 OdimWhereGeoimage, OdimWhatDset ]:
                                 istanza della classe che implementa il gruppo o
@@ -156,9 +167,14 @@ class OdimHierarchyImage(StructBase):
         dell'istanza di classe OdimHierarchyImage che deve essere riempito di contenuti.
         """
 
-        for att in attrs_list:
-            if att in hgroup.attrs.keys():
-                out_cont.__setattr__(att, hgroup.attrs.__getitem__(att))
+        # materializzo gli attributi in un dict Python con una singola lettura
+        # bulk dei metadati HDF5, poi un solo passaggio su items() filtrato
+        # dal frozenset dei nomi richiesti
+        attrs = hgroup if isinstance(hgroup, dict) else dict(hgroup.attrs)
+        wanted = frozenset(attrs_list)
+        for name, val in attrs.items():
+            if name in wanted:
+                setattr(out_cont, name, val)
 
         return None
 
@@ -175,9 +191,12 @@ class OdimHierarchyImage(StructBase):
 
         INPUT:
         -out_filename   --str : filename del file ODIM in output.
+
+        Nota: il file è scritto con libver='latest', quindi leggibile solo con
+        HDF5 >= 1.10.
         """
 
-        hf = h5py.File(out_filename, "w")
+        hf = h5py.File(out_filename, "w", libver="latest", track_order=False, rdcc_nbytes=ODIM_RDCC_NBYTES)
         self.root_what.odim_create(hf)
         self.root_what.odim_setattrs(hf, ["object", "version", "date", "time", "source"])
 
@@ -207,9 +226,8 @@ class OdimHierarchyImage(StructBase):
         g_dset_what.odim_create(hf)
         g_dset_what.odim_setattrs(hf, ["product", "startdate", "starttime", "enddate", "endtime"])
 
-        dset = OdimDset8bImage(self.dataset.data, "dataset1/data1/data")
-        dset.odim_create(hf)
-        dset.odim_setattrs(hf, ["CLASS", "IMAGE_VERSION"])
+        self.dataset.odim_create(hf)
+        self.dataset.odim_setattrs(hf, ["CLASS", "IMAGE_VERSION"])
         dset_what = self.group_data_what
         dset_what.odim_create(hf)
         dset_what.odim_setattrs(hf, ["quantity", "gain", "nodata", "offset", "undetect"])
@@ -234,14 +252,15 @@ class OdimHierarchyImage(StructBase):
         - filename    --str : filename del file odim da leggere
         """
 
-        hr = h5py.File(filename, "r")
+        hr = h5py.File(filename, "r", rdcc_nbytes=ODIM_RDCC_NBYTES, rdcc_nslots=ODIM_RDCC_NSLOTS)
+        what_attrs = dict(hr["what"].attrs)
         root_what = OdimWhat(
             hierarchy="what",
-            obj=hr["what"].attrs["object"],
-            version=hr["what"].attrs["version"],
-            date=hr["what"].attrs["date"],
-            time=hr["what"].attrs["time"],
-            source=hr["what"].attrs["source"],
+            obj=what_attrs["object"],
+            version=what_attrs["version"],
+            date=what_attrs["date"],
+            time=what_attrs["time"],
+            source=what_attrs["source"],
         )
         root_where = OdimWhereGeoimage("where")
         attrswhere = [
@@ -277,7 +296,11 @@ class OdimHierarchyImage(StructBase):
         attrs_ = ["quantity", "gain", "nodata", "offset", "undetect"]
         self.get_attrs_from_odimgroup(attrs_, hr["dataset1/data1/what"], data_what)
 
-        data = hr["dataset1/data1/data"][:]
+        # read_direct nel buffer preallocato: evita la copia intermedia
+        # dello slicing high-level di h5py
+        ds = hr["dataset1/data1/data"]
+        data = np.empty(ds.shape, dtype=ds.dtype)
+        ds.read_direct(data)
         dataset = OdimDset8bImage(data, "dataset1/data1/data")
         self.get_attrs_from_odimgroup(["CLASS", "IMAGE_VERSION"], hr["dataset1/data1/data"], dataset)
         hr.close()
@@ -1,4 +1,6 @@
 from simcradarlib.odim.odim_utils import (
+    ODIM_RDCC_NBYTES,
+    ODIM_RDCC_NSLOTS,
     OdimDset,
     OdimWhat,
     OdimWherePolar,
@@ -9,9 +11,35 @@ from simcradarlib.odim.odim_utils import (
     OdimWhatDset,
 )
 from simcradarlib.io_utils.structure_class import StructBase
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
 import h5py
 import numpy as np
-from typing import List, Union, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+
+# pattern dei nomi dei gruppi "dataset<n>" (elevazioni) e "data<m>" (grandezze):
+# il match esatto esclude chiavi spurie e il suffisso numerico permette
+# l'ordinamento naturale (dataset10 dopo dataset9, non dopo dataset1)
+_DATASET_GROUP_RE = re.compile(r"^dataset(\d+)$")
+_DATA_GROUP_RE = re.compile(r"^data(\d+)$")
+
+
+# dtype dell'array strutturato con i metadati dei gruppi "dataset<n>/data<m>/what"
+# di un'elevazione: layout SoA che permette di estrarre i vettori di gain/offset
+# con un semplice slicing invece di iterare oggetti Python
+_WHAT_META_DTYPE = np.dtype(
+    [("quantity", "U16"), ("gain", "f4"), ("offset", "f4"), ("nodata", "f4"), ("undetect", "f4")]
+)
+
+
+def _dec(val):
+    """
+    Decodifica ascii un valore byte-string di attributo ODIM, lasciando
+    invariati i valori di altro tipo.
+    """
+    return val.decode("ascii") if isinstance(val, (bytes, np.bytes_)) else val
 
 
 class OdimHierarchyPvol(StructBase):
@@ -193,6 +221,18 @@ class OdimHierarchyPvol(StructBase):
     elangles: List[Optional[float]]
     varsnames: List[str]
 
+    # nomi degli attributi indicizzati per elevazione, accessibili tramite
+    # get_group_by_elangle (i gruppi root non sono legati a un'elevazione)
+    _GROUP_ATTRS = frozenset(
+        (
+            "group_datasets_what",
+            "group_datasets_where",
+            "group_datasets_how_radar",
+            "group_datasets_how_polar",
+            "group_datasets_data_what",
+        )
+    )
+
     def __init__(
         self,
     ):
@@ -256,7 +296,54 @@ class OdimHierarchyPvol(StructBase):
         assert self.datasets.__len__() == self.n_group_dataset
         assert self.group_datasets_data_what.__len__() == self.n_group_dataset
 
+        # se le shape dei blocchi per elevazione coincidono, consolido i dati
+        # in un unico tensore 4D C-contiguo (n_elev,n_datasets,nrays,nbins) e
+        # sostituisco gli elementi di self.datasets con viste su di esso:
+        # gli accessi successivi per elevazione diventano slicing senza copia.
+        # Per shape ragged (nbins o numero di grandezze variabili) resta la
+        # lista di blocchi 3D per elevazione.
+        shapes = {np.shape(d) for d in self.datasets}
+        if len(shapes) == 1 and self.n_group_dataset > 0:
+            self._datasets_block = np.stack(self.datasets, axis=0)
+            self.datasets = [self._datasets_block[i] for i in range(self.n_group_dataset)]
+        else:
+            self._datasets_block = None
+
         self.elangles = [self.group_datasets_where[i].elangle for i in range(self.n_group_dataset)]
+        # tabella {elangle: indice} per accesso O(1) nei metodi get_*_by_elangle,
+        # evitando scansioni lineari ripetute di self.elangles
+        self._elangle_idx = {e: i for i, e in enumerate(self.elangles)}
+        # indice {quantity: m} per ciascuna elevazione: evita la copia di
+        # varsnames e le ricerche lineari in get_data_by_elangle; una grandezza
+        # non storata a una data elevazione (es. "Z_VD" all'ultima) è
+        # semplicemente assente dalla tabella di quella elevazione
+        self._quantity_idx_per_elev = [
+            {w.quantity: m for m, w in enumerate(whats) if w.quantity is not None}
+            for whats in self.group_datasets_data_what
+        ]
+        # metadati dei gruppi what per elevazione in forma di array strutturato
+        # (vedi _WHAT_META_DTYPE): la decodifica vettoriale legge i gain e gli
+        # offset con uno slicing di campo invece di un loop sugli OdimWhatDset
+        self._meta_per_elev = [
+            np.array(
+                [
+                    (
+                        w.quantity or "",
+                        w.gain if w.gain is not None else np.nan,
+                        w.offset if w.offset is not None else np.nan,
+                        w.nodata if w.nodata is not None else np.nan,
+                        w.undetect if w.undetect is not None else np.nan,
+                    )
+                    for w in whats
+                ],
+                dtype=_WHAT_META_DTYPE,
+            )
+            for whats in self.group_datasets_data_what
+        ]
+        # pool di buffer di output per la decodifica, chiave (elangle, quantity):
+        # le chiamate ripetute a get_data_by_elangle riusano lo stesso array
+        # float32 invece di allocarne uno nuovo ad ogni decodifica
+        self._decode_cache: Dict[Tuple[float, str], np.ndarray] = {}
         #self.varsnames = [self.group_datasets_data_what[0][i].quantity for i in range(self.n_datasets)]
 
     def get_group_by_elangle(
@@ -318,7 +405,9 @@ class OdimHierarchyPvol(StructBase):
         __________________________________________________________________________________________
         """
 
-        return self.__dict__[namegroup][self.elangles.index(elangle)]
+        if namegroup not in self._GROUP_ATTRS:
+            raise ValueError(f"namegroup '{namegroup}' non valido: ammessi {sorted(self._GROUP_ATTRS)}")
+        return getattr(self, namegroup)[self._elangle_idx[elangle]]
 
     def get_data_by_elangle(self, elangle: float, quantity: str) -> np.ndarray:
 
@@ -338,6 +427,11 @@ class OdimHierarchyPvol(StructBase):
                             --np.ndarray:
                                      array 2D di dati della grandezza radar scelta,
                                      acquisiti all'elevazione scelta 'elangle'.
+                                     L'array restituito è un buffer riusato dalle
+                                     chiamate successive con la stessa coppia
+                                     (elangle, quantity): farne una .copy() se
+                                     va conservato oltre la chiamata seguente
+                                     (vedi reset_cache).
 
         ____________________________________Esempio__________________________________
         Per accedere ai dati di riflettività alla prima elevazione si passa in input
@@ -348,24 +442,71 @@ class OdimHierarchyPvol(StructBase):
         _____________________________________________________________________________
         """
 
-        # try:
-        varsnames_elangle = self.varsnames.copy()
-        if elangle==max(self.elangles) and "Z_VD" in varsnames_elangle:
-            varsnames_elangle.remove("Z_VD")
-        indexq = varsnames_elangle.index(quantity)
-        # except ValueError:
-        # indexq = self.varsnames.index(quantity.encode("utf-8"))
-
-        raw = self.datasets[self.elangles.index(elangle)][indexq]
-        offset = self.group_datasets_data_what[self.elangles.index(elangle)][indexq].offset
-        gain = self.group_datasets_data_what[self.elangles.index(elangle)][indexq].gain
-        data = raw * gain + offset
+        idx = self._elangle_idx[elangle]
+        indexq = self._quantity_idx_per_elev[idx][quantity]
+        raw = self.datasets[idx][indexq]
+        # risolvo una volta sola il gruppo what della grandezza, invece di
+        # rifare la doppia indicizzazione per ciascuno di gain e offset
+        what = self.group_datasets_data_what[idx][indexq]
+        # decodifica fusa nel buffer float32 del pool (allocato alla prima
+        # richiesta di questa coppia (elangle, quantity) e poi riusato):
+        # niente array intermedio di raw*gain, niente upcast a float64 dei
+        # conteggi raw e zero allocazioni sulle chiamate ripetute
+        data = self._decode_cache.get((elangle, quantity))
+        if data is None:
+            data = np.empty(raw.shape, dtype=np.float32)
+            self._decode_cache[(elangle, quantity)] = data
+        np.multiply(raw, np.float32(what.gain), out=data)
+        np.add(data, np.float32(what.offset), out=data)
+        return data
+
+    def reset_cache(self) -> None:
+
+        """
+        Metodo di istanza della classe OdimHierarchyPvol che svuota il pool
+        dei buffer di decodifica riusati da get_data_by_elangle, liberando
+        la memoria e scollegando gli array già restituiti ai chiamanti.
+        """
+
+        self._decode_cache.clear()
+
+    def get_all_data_by_elangle(self, elangle: float) -> np.ndarray:
+
+        """
+        Metodo di istanza della classe OdimHierarchyPvol che decodifica in un
+        solo passaggio tutte le grandezze radar storate per una data elevazione.
+
+        Le coppie (gain, offset) delle varie grandezze vengono applicate come
+        vettori broadcast di shape (n_datasets,1,1) sull'intero blocco
+        (n_datasets,nrays,nbins), così il costo Python e il traffico in memoria
+        vengono ammortizzati su tutte le grandezze invece di ripetere una
+        passata per ciascuna chiamata a get_data_by_elangle.
+
+        INPUT:
+        -elangle           --float : angolo di elevazione.
+
+        OUTPUT:
+                            --np.ndarray:
+                                     array 3D float32 di shape (n_datasets,nrays,nbins)
+                                     con i dati decodificati di tutte le grandezze
+                                     storate all'elevazione scelta, nell'ordine dei
+                                     gruppi "dataset<n>/data<m>".
+        """
+
+        idx = self._elangle_idx[elangle]
+        raw = self.datasets[idx]
+        meta = self._meta_per_elev[idx]
+        gains = meta["gain"][:, None, None]
+        offsets = meta["offset"][:, None, None]
+        data = np.empty(raw.shape, dtype=np.float32)
+        np.multiply(raw, gains, out=data)
+        np.add(data, offsets, out=data)
         return data
 
     def get_attrs_from_odimgroup(
         self,
         attrs_list: list,
-        hgroup: h5py._hl.group.Group,
+        hgroup: Union[h5py._hl.group.Group, dict],
         out_cont: Union[
             OdimDset,
             OdimWhat,
@@ -387,9 +528,11 @@ class OdimHierarchyPvol(StructBase):
         -attrs_list    --list : Lista di attributi da leggere nel file ODIM.
                                 Possono essere attributi di un oggetto gruppo
                                 o di un dataset.
-        -hgroup        --h5py._hl.group.Group :
+        -hgroup        --Union[h5py._hl.group.Group,dict] :
                                 oggetto Group di h5py corrispondente al
-                                gruppo ODIM di cui voglio leggere gli attributi.
+                                gruppo ODIM di cui voglio leggere gli attributi,
+                                oppure il dict dei suoi attributi già
+                                materializzato.
         -out_cont      --Union[ simcradarlib.odim.odim_utils.OdimDset,
                                 simcradarlib.odim.odim_utils.OdimWhat,
                                 simcradarlib.odim.odim_utils.OdimHow,
@@ -412,13 +555,18 @@ class OdimHierarchyPvol(StructBase):
         che voglio riempire di contenuti.
         """
 
+        # materializzo gli attributi in un dict Python con una singola lettura
+        # bulk dei metadati HDF5: niente view .keys() né un round-trip
+        # __getitem__ per ciascun attributo richiesto
+        attrs = hgroup if isinstance(hgroup, dict) else dict(hgroup.attrs)
         for att in attrs_list:
-            if att in hgroup.attrs.keys():
-                val_att = hgroup.attrs.__getitem__(att)
-                if type(val_att)==np.bytes_:
-                    out_cont.__setattr__(att, val_att.decode())
-                else:
-                    out_cont.__setattr__(att, val_att)
+            val_att = attrs.get(att)
+            if val_att is None:
+                continue
+            if isinstance(val_att, (bytes, np.bytes_)):
+                setattr(out_cont, att, val_att.decode("ascii"))
+            else:
+                setattr(out_cont, att, val_att)
 
     def export_odim(self, out_filename: str) -> None:
 
@@ -436,9 +584,12 @@ class OdimHierarchyPvol(StructBase):
         INPUT:
 
         -out_filename   --str : filename del file ODIM in output.
+
+        Nota: il file è scritto con libver='latest', quindi leggibile solo con
+        HDF5 >= 1.10.
         """
 
-        hf = h5py.File(out_filename, "w")
+        hf = h5py.File(out_filename, "w", libver="latest", track_order=False)
         self.root_what.odim_create(hf)
         self.root_what.odim_setattrs(hf, ["object", "version", "date", "time", "source"])
 
@@ -448,7 +599,7 @@ class OdimHierarchyPvol(StructBase):
         self.root_how.odim_create(hf)
         self.root_how.odim_setattrs(hf, ["task", "startepochs", "system", "software", "sw_version", "simulated"])
 
-        for i_group, num_group in enumerate(np.arange(1, self.n_group_dataset, 1)):
+        for i_group, num_group in enumerate(range(1, self.n_group_dataset + 1)):
 
             g_dset_what = self.group_datasets_what[i_group]
             g_dset_what.odim_create(hf)
@@ -485,19 +636,121 @@ class OdimHierarchyPvol(StructBase):
                 ],
             )
 
-            for i_dset, num_dset in enumerate(np.arange(1, self.n_datasets, 1)):
-                if i_dset<self.datasets[i_group].__len__():
-                    dset_i = OdimDset(self.datasets[i_group][i_dset], f"dataset{num_group}/data{num_dset}/data")
-                    dset_i.odim_create(hf)
-                    if i_dset<self.group_datasets_data_what[i_group].__len__():
-                        dseti_what = self.group_datasets_data_what[i_group][i_dset]
-                        dseti_what.odim_create(hf)
-                        dseti_what.odim_setattrs(hf, ["quantity", "gain", "nodata", "offset", "undetect"])
+            # blocchi e numero di grandezze risolti una volta sola per
+            # elevazione: niente __len__ e indicizzazioni ripetute nel loop
+            # interno, e il min() gestisce le elevazioni ragged (es. Z_VD
+            # assente all'ultima)
+            data_block = self.datasets[i_group]
+            whats_block = self.group_datasets_data_what[i_group]
+            n_m = min(len(data_block), len(whats_block), self.n_datasets)
+            for i_dset in range(n_m):
+                num_dset = i_dset + 1
+                dset_i = OdimDset(data_block[i_dset], f"dataset{num_group}/data{num_dset}/data")
+                dset_i.odim_create(hf)
+                dseti_what = whats_block[i_dset]
+                dseti_what.odim_create(hf)
+                dseti_what.odim_setattrs(hf, ["quantity", "gain", "nodata", "offset", "undetect"])
 
         hf.close()
         return None
 
-    def read_odim(self, filename: str) -> None:
+    def _load_group(self, hr: h5py._hl.files.File, gdname: str) -> tuple:
+
+        """
+        Metodo privato di OdimHierarchyPvol che carica metadati e payload di
+        un singolo gruppo "dataset<n>" del file ODIM aperto 'hr'.
+
+        Restituisce la tupla
+        (dg_what, dg_where, dg_how_radar, dg_how_polar, block, data_what_list)
+        dove 'block' è l'np.ndarray (n_data,nrays,nbins) dei payload letti e
+        'data_what_list' la lista di OdimWhatDset dei gruppi "data<m>/what".
+
+        Pensato per essere eseguito in un thread pool da read_odim: h5py
+        rilascia il GIL durante le chiamate C di lettura, quindi più gruppi
+        possono essere caricati in overlap.
+        """
+
+        dg_what = OdimWhatDset(hierarchy=f"{gdname}/what")
+        attrs_ = ["product", "startdate", "starttime", "enddate", "endtime"]
+        self.get_attrs_from_odimgroup(attrs_, hr[f"{gdname}/what"], dg_what)
+
+        dg_where = OdimWherePolarDset(f"{gdname}/where", None, None, None, None, None, None)
+        attrs_ = ["elangle", "nbins", "rstart", "rscale", "nrays", "a1gate"]
+        self.get_attrs_from_odimgroup(attrs_, hr[f"{gdname}/where"], dg_where)
+
+        # un solo snapshot di attributi e di nomi del gruppo how, condiviso
+        # tra la lettura delle specifiche radar e di quelle polari
+        how_grp = hr[f"{gdname}/how"]
+        how_attrs = dict(how_grp.attrs)
+        dg_how_radar = OdimHowRadarDset(f"{gdname}/how")
+        attrs_ = [
+            "beamwidth",
+            "wavelength",
+            "rpm",
+            "pulsewidth",
+            "RXbandwidth",
+            "lowprf",
+            "highprf",
+            "TXloss",
+            "RXloss",
+            "radomeloss",
+            "antgain",
+            "beamwH",
+            "beamwV",
+            "gasattn",
+            "nomTXpower",
+            "NI",
+            "Vsamples",
+        ]
+        self.get_attrs_from_odimgroup(attrs_, how_attrs, dg_how_radar)
+
+        dg_how_polar = OdimHowPolarDset(f"{gdname}/how")
+        attrs_ = ["elangles", "startazA", "stopazA", "startazT", "stopazT"]
+        # lookup con .get sullo snapshot invece di __getitem__ + KeyError
+        # attraverso il layer C di h5py; il fallback per gli attributi
+        # storati come dataset usa un unico set dei nomi del gruppo
+        how_keys = set(how_grp.keys())
+        for att in attrs_:
+            val = how_attrs.get(att)
+            if val is None and att in how_keys:
+                val = how_grp[att][:]
+            if val is not None:
+                setattr(dg_how_polar, att, val)
+
+        # leggo i dataset e i gruppi what dei dataset, in ordine numerico
+        data_what_list = []
+        dmatches = sorted(
+            (int(m.group(1)), dd) for dd in hr[f"{gdname}"].keys() for m in (_DATA_GROUP_RE.match(dd),) if m
+        )
+        dataset_names = [dd for _, dd in dmatches]
+        # blocco (n_data, nrays, nbins) preallocato per l'elevazione: ogni
+        # payload viene letto con read_direct direttamente nella sua riga,
+        # senza array intermedi per-grandezza né la copia finale di vstack
+        ds0 = hr[f"{gdname}/{dataset_names[0]}/data"]
+        block = np.empty((len(dataset_names),) + ds0.shape, dtype=ds0.dtype)
+        for i, d in enumerate(dataset_names):
+            hr[f"{gdname}/{d}/data"].read_direct(block[i])
+            # un'unica enumerazione bulk degli attributi del gruppo what
+            # invece di cinque aperture/letture HDF5 distinte
+            wattrs = dict(hr[f"{gdname}/{d}/what"].attrs)
+            d_what = OdimWhatDset(
+                hierarchy=f"{gdname}/{d}/what",
+                quantity=_dec(wattrs["quantity"]),
+                gain=wattrs["gain"],
+                offset=wattrs["offset"],
+                nodata=wattrs["nodata"],
+                undetect=wattrs["undetect"],
+            )
+            data_what_list.append(d_what)
+
+        return dg_what, dg_where, dg_how_radar, dg_how_polar, block, data_what_list
+
+    def read_odim(
+        self,
+        filename: str,
+        rdcc_nbytes: int = ODIM_RDCC_NBYTES,
+        rdcc_nslots: int = ODIM_RDCC_NSLOTS,
+    ) -> None:
 
         """
         Metodo di istanza della classe OdimHierarchyPvol che legge un file ODIM OPERA v.2.1
@@ -509,9 +762,25 @@ class OdimHierarchyPvol(StructBase):
 
         INPUT:
         - filename    --str : filename del file ODIM da leggere
+        - rdcc_nbytes --int : dimensione in bytes della chunk cache HDF5 per
+                              dataset aperto (default ODIM_RDCC_NBYTES). Deve
+                              coprire almeno un chunk intero per evitare
+                              ri-decompressioni quando si leggono più grandezze
+                              per elevazione.
+        - rdcc_nslots --int : numero (primo) di slot della chunk cache
+                              (default ODIM_RDCC_NSLOTS).
         """
 
-        hr = h5py.File(filename, "r")
+        # per file che stanno comodamente in RAM uso il driver "core", che
+        # carica il file in memoria in una sola lettura sequenziale: le molte
+        # piccole letture di attributi e dataset che seguono non pagano più
+        # il costo per-syscall del driver POSIX di default
+        driver_kw: dict = {}
+        if os.path.getsize(filename) < 200 * 1024 * 1024:
+            driver_kw = {"driver": "core", "backing_store": False}
+        hr = h5py.File(
+            filename, "r", rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots, rdcc_w0=0.75, **driver_kw
+        )
 
         gd_what_list = []
         gd_where_list = []
@@ -519,94 +788,45 @@ class OdimHierarchyPvol(StructBase):
         gd_how_radar_list = []
         gd_datadset_list_total = []
         gd_data_what_list_total = []
+        # una sola materializzazione bulk degli attributi per gruppo root,
+        # invece di una chiamata HDF5 distinta per ciascun attributo
+        what_attrs = dict(hr["what"].attrs)
         root_what = OdimWhat(
             hierarchy="what",
-            obj=hr["what"].attrs["object"].decode(),
-            version=hr["what"].attrs["version"].decode(),
-            date=hr["what"].attrs["date"].decode(),
-            time=hr["what"].attrs["time"].decode(),
-            source=hr["what"].attrs["source"].decode(),
-        )
-        root_where = OdimWherePolar(
-            "where", hr["where"].attrs["lon"], hr["where"].attrs["lat"], hr["where"].attrs["height"]
+            obj=_dec(what_attrs["object"]),
+            version=_dec(what_attrs["version"]),
+            date=_dec(what_attrs["date"]),
+            time=_dec(what_attrs["time"]),
+            source=_dec(what_attrs["source"]),
         )
+        where_attrs = dict(hr["where"].attrs)
+        root_where = OdimWherePolar("where", where_attrs["lon"], where_attrs["lat"], where_attrs["height"])
         attrs_howroot = ["task", "startepochs", "system", "software", "sw_version", "simulated"]
         root_how = OdimHow("how")
         self.get_attrs_from_odimgroup(attrs_howroot, hr["how"], root_how)
 
-        nmax_datasets=0
-        allquantities=[]
-        # poi itero sui dataset
-        group_dataset_names = [k for k in hr.keys() if "dataset" in k]
-        for gdname in group_dataset_names:
-
-            dg_what = OdimWhatDset(hierarchy=f"{gdname}/what")
-            attrs_ = ["product", "startdate", "starttime", "enddate", "endtime"]
-            self.get_attrs_from_odimgroup(attrs_, hr[f"{gdname}/what"], dg_what)
-
-            dg_where = OdimWherePolarDset(f"{gdname}/where", None, None, None, None, None, None)
-            attrs_ = ["elangle", "nbins", "rstart", "rscale", "nrays", "a1gate"]
-            self.get_attrs_from_odimgroup(attrs_, hr[f"{gdname}/where"], dg_where)
-
-            dg_how_radar = OdimHowRadarDset(f"{gdname}/how")
-            attrs_ = [
-                "beamwidth",
-                "wavelength",
-                "rpm",
-                "pulsewidth",
-                "RXbandwidth",
-                "lowprf",
-                "highprf",
-                "TXloss",
-                "RXloss",
-                "radomeloss",
-                "antgain",
-                "beamwH",
-                "beamwV",
-                "gasattn",
-                "nomTXpower",
-                "NI",
-                "Vsamples",
-            ]
-            self.get_attrs_from_odimgroup(attrs_, hr[f"{gdname}/how"], dg_how_radar)
-
-            dg_how_polar = OdimHowPolarDset(f"{gdname}/how")
-            attrs_ = ["elangles", "startazA", "stopazA", "startazT", "stopazT"]
-            for att in attrs_:
-                try:
-                    dg_how_polar.__setattr__(att, hr[f"{gdname}/how"].attrs.__getitem__(att))
-                except KeyError:
-                    if att in hr[f"{gdname}/how"].keys():
-                        dg_how_polar.__setattr__(att, hr[f"{gdname}/how"][att][:])
-
+        # poi itero sui dataset, in ordine numerico di elevazione: un task del
+        # pool per ciascun gruppo "dataset<n>" (h5py rilascia il GIL durante le
+        # letture C, quindi il caricamento dei gruppi avviene in overlap);
+        # executor.map restituisce i risultati nell'ordine di sottomissione
+        matches = sorted((int(m.group(1)), k) for k in hr.keys() for m in (_DATASET_GROUP_RE.match(k),) if m)
+        group_dataset_names = [k for _, k in matches]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda gd: self._load_group(hr, gd), group_dataset_names))
+
+        nmax_datasets = 0
+        allquantities: List[str] = []
+        for dg_what, dg_where, dg_how_radar, dg_how_polar, block, data_what_list in results:
             gd_what_list.append(dg_what)
             gd_where_list.append(dg_where)
             gd_how_polar_list.append(dg_how_polar)
             gd_how_radar_list.append(dg_how_radar)
-            # leggo i dataset e i gruppi what dei dataset gd_datadset_list
-            gd_data_what_list = []
-            gd_datadset_list = []
-            dataset_names = [dd for dd in hr[f"{gdname}"].keys() if "data" in dd]
-            nmax_datasets=max(nmax_datasets,len(dataset_names))
-            for d in dataset_names:
-                gd_datadset_list.append(hr[f"{gdname}/{d}/data"][:])
-                whatd = hr[f"{gdname}/{d}/what"]
-                quantity = whatd.attrs["quantity"]
-                if type(quantity)==np.bytes_ : quantity = quantity.decode()
-                d_what = OdimWhatDset(
-                    hierarchy=f"{gdname}/{d}/what",
-                    quantity=quantity, #whatd.attrs["quantity"],
-                    gain=whatd.attrs["gain"],
-                    offset=whatd.attrs["offset"],
-                    nodata=whatd.attrs["nodata"],
-                    undetect=whatd.attrs["undetect"],
-                )
-                gd_data_what_list.append(d_what)
-                if quantity not in allquantities:
-                    allquantities.append(quantity)
-
-            gd_data_what_list_total.append(np.array(gd_data_what_list))
-            gd_datadset_list_total.append(np.vstack([[d] for d in gd_datadset_list]))
+            gd_data_what_list_total.append(np.array(data_what_list))
+            gd_datadset_list_total.append(block)
+            nmax_datasets = max(nmax_datasets, len(data_what_list))
+            for d_what in data_what_list:
+                if d_what.quantity not in allquantities:
+                    allquantities.append(d_what.quantity)
 
         hr.close()
 
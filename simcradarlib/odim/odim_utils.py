@@ -47,6 +47,26 @@ Ogni classe ha il metodo di istanza (talvolta ereditato):
 """
 
 
+# Dimensionamento della chunk cache HDF5 per i file ODIM: 16 MiB coprono i
+# chunk tipici delle mappe radar (il default di h5py è 1 MiB) e il numero di
+# slot è un primo ~100x il numero di chunk attesi, come da raccomandazioni HDF5.
+ODIM_RDCC_NBYTES = 16 << 20
+ODIM_RDCC_NSLOTS = 12503
+
+
+def _auto_chunks(shape: tuple, itemsize: int, target: int = 1 << 20) -> tuple:
+    """
+    Sceglie una shape di chunk HDF5 con dimensione vicina (per difetto) a
+    'target' byte (default 1 MiB), dimezzando iterativamente l'asse maggiore
+    della shape del dataset.
+    """
+    chunk = list(shape)
+    while int(np.prod(chunk)) * itemsize > target:
+        axis = int(np.argmax(chunk))
+        chunk[axis] = (chunk[axis] + 1) // 2
+    return tuple(chunk)
+
+
 class OdimDset(StructBase):
 
     """
@@ -73,7 +93,13 @@ class OdimDset(StructBase):
         self.data = data
         self.hierarchy = hierarchy
 
-    def odim_create(self, hf: h5py._hl.files.File) -> None:
+    def odim_create(
+        self,
+        hf: h5py._hl.files.File,
+        chunks: Optional[tuple] = None,
+        compression: Optional[str] = "gzip",
+        shuffle: bool = True,
+    ) -> None:
 
         """
         Metodo di istanza della classe OdimDset, che crea nel file ODIM,
@@ -83,8 +109,21 @@ class OdimDset(StructBase):
         nell'attributo 'data' dell'istanza della classe OdimDset.
 
         INPUT:
-        -hf --h5py._hl.files.File : oggetto di h5py corrispondente al file ODIM
-                                    aperto in scrittura.
+        -hf          --h5py._hl.files.File : oggetto di h5py corrispondente al
+                                             file ODIM aperto in scrittura.
+        -chunks      --Optional[tuple]     : shape dei chunk HDF5; se None viene
+                                             scelta con _auto_chunks, vicina a
+                                             1 MiB e allineata al pattern di
+                                             accesso tipico (lettura di un PPI).
+        -compression --Optional[str]       : filtro di compressione (default
+                                             "gzip": è lo zlib richiesto dalle
+                                             specifiche ODIM OPERA, leggibile
+                                             da qualsiasi toolchain HDF5; "lzf"
+                                             è più veloce ma è un filtro
+                                             privato di h5py, da usare solo per
+                                             file interni).
+        -shuffle     --bool                : filtro shuffle prima della
+                                             compressione (default True).
 
         _____________________________Esempio__________________________________
         Si può creare un oggetto dataset al livello gerarchico
@@ -96,12 +135,21 @@ class OdimDset(StructBase):
         istanza.odim_create(hf)
         """
 
+        # il dtype del file è quello dell'array in memoria: i conteggi radar
+        # sono tipicamente uint8/uint16 e la coppia (gain, offset) definisce
+        # già la ricostruzione in float, quindi l'upcast a float32 in scrittura
+        # quadruplicherebbe i byte su disco senza informazione aggiuntiva
+        dtype = self.data.dtype
+        if chunks is None:
+            chunks = _auto_chunks(self.data.shape, dtype.itemsize)
         hf.create_dataset(
             self.hierarchy,
             shape=self.data.shape,
-            dtype=np.float32,
+            dtype=dtype,
             data=self.data,
-            compression="gzip",
+            chunks=chunks,
+            compression=compression,
+            shuffle=shuffle,
         )
 
 
@@ -136,6 +184,47 @@ class OdimDset8bImage(OdimDset):
         self.CLASS = CLASS
         self.IMAGE_VERSION = IMAGE_VERSION
 
+    def odim_create(self, hf: h5py._hl.files.File) -> None:
+
+        """
+        Metodo di istanza della classe OdimDset8bImage che crea nel file ODIM,
+        aperto in scrittura tramite h5py.File(), il dataset al livello
+        gerarchico definito dall'attributo 'hierarchy' dell'istanza.
+
+        Le mappe sono compresse gzip (lo zlib delle specifiche ODIM OPERA,
+        leggibile da qualsiasi toolchain HDF5) con filtro shuffle; sopra 1 MiB
+        i chunk sono dimensionati a circa 1 MiB con _auto_chunks per favorire
+        le letture parziali, sotto la scelta dei chunk è lasciata ad h5py.
+
+        INPUT:
+        -hf --h5py._hl.files.File : oggetto di h5py corrispondente al file ODIM
+                                    aperto in scrittura.
+        """
+
+        itemsize = np.dtype(np.float32).itemsize
+        nbytes = int(np.prod(self.data.shape)) * itemsize
+        if nbytes < (1 << 20):
+            # gzip richiede comunque storage chunked: per le mappe piccole
+            # lascio la scelta dei chunk ad h5py
+            hf.create_dataset(
+                self.hierarchy,
+                shape=self.data.shape,
+                dtype=np.float32,
+                data=self.data,
+                compression="gzip",
+                shuffle=True,
+            )
+        else:
+            hf.create_dataset(
+                self.hierarchy,
+                shape=self.data.shape,
+                dtype=np.float32,
+                data=self.data,
+                chunks=_auto_chunks(self.data.shape, itemsize),
+                compression="gzip",
+                shuffle=True,
+            )
+
     def odim_setattrs(self, hf: h5py._hl.files.File, attrslist: list) -> None:
 
         """
@@ -173,14 +262,15 @@ class OdimDset8bImage(OdimDset):
         except ValueError:
             self.odim_create(hf)
             g = hf.require_dataset(self.hierarchy, self.data.shape, np.array(self.data).dtype)
+        # costruisco il dizionario degli attributi da scrivere e lo storo con un
+        # unico attrs.update, così HDF5 può accorpare gli aggiornamenti dei metadati
+        attrs_out = {}
         for attr in attrslist:
-            if self.struct_hasitem(attr):
-                attr_val = self.struct_getitem(attr)
-                if attr_val is not None:
-                    if type(attr_val) == str:
-                        g.attrs.__setitem__(attr, np.bytes_(self.struct_getitem(attr)))
-                    else:
-                        g.attrs.__setitem__(attr, self.struct_getitem(attr))
+            attr_val = self.struct_getitem(attr)
+            if attr_val is not None:
+                attrs_out[attr] = np.bytes_(attr_val) if isinstance(attr_val, str) else attr_val
+        if attrs_out:
+            g.attrs.update(attrs_out)
 
 
 class OdimGroup(StructBase):
@@ -282,14 +372,15 @@ class OdimGroup(StructBase):
             g = hf.require_group(self.hierarchy)
         except ValueError:
             self.odim_create(hf)
+            g = hf.require_group(self.hierarchy)
+        # come per OdimDset8bImage.odim_setattrs: un solo attrs.update per gruppo
+        attrs_out = {}
         for attr in attrslist:
-            if self.struct_hasitem(attr):
-                attr_val = self.struct_getitem(attr)
-                if attr_val is not None:
-                    if type(attr_val) == str:
-                        g.attrs.__setitem__(attr, np.bytes_(self.struct_getitem(attr)))
-                    else:
-                        g.attrs.__setitem__(attr, self.struct_getitem(attr))
+            attr_val = self.struct_getitem(attr)
+            if attr_val is not None:
+                attrs_out[attr] = np.bytes_(attr_val) if isinstance(attr_val, str) else attr_val
+        if attrs_out:
+            g.attrs.update(attrs_out)
 
 
 class OdimWhat(OdimGroup):